@@ -1,55 +1,110 @@
 # evidence_pack.py
 from __future__ import annotations
 
+import functools
 import os
 import re
+from bisect import bisect_right
+from collections import defaultdict
 from dataclasses import dataclass
-from typing import List, Optional, Dict, Any
+from itertools import accumulate
+from operator import itemgetter
+from typing import Callable, List, Optional, Dict, Any, Tuple, TypeVar
 
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
 from unidecode import unidecode
 
 from vi_insights_reader import TimedText
 from whisper_stt import WhisperSegment
 
 
+_NON_ALNUM = re.compile(r"[^a-z0-9\s]+")
+_WS = re.compile(r"\s+")
+_LEN_BUCKET = 8
+
+# Lowercase Vietnamese letters -> ASCII; str.translate runs in C, unlike unidecode's per-char lookups
+_VN_TABLE = str.maketrans({
+    ch: base
+    for base, chars in (
+        ("a", "àáảãạăằắẳẵặâầấẩẫậ"),
+        ("e", "èéẻẽẹêềếểễệ"),
+        ("i", "ìíỉĩị"),
+        ("o", "òóỏõọôồốổỗộơờớởỡợ"),
+        ("u", "ùúủũụưừứửữự"),
+        ("y", "ỳýỷỹỵ"),
+        ("d", "đ"),
+    )
+    for ch in chars
+})
+
+T = TypeVar("T")
+
+
 def _fmt_ts(sec: Optional[float]) -> str:
     if sec is None:
         return "??:??"
-    m = int(sec // 60)
-    s = sec - m * 60
-    return f"{m:02d}:{s:04.1f}"
+    # integer deciseconds: cheaper than float formatting, and 59.96s rolls over to 01:00.0
+    m, r = divmod(int(round(sec * 10)), 600)
+    s, t = divmod(r, 10)
+    return "%02d:%02d.%d" % (m, s, t)
 
 
+@functools.lru_cache(maxsize=4096)
 def normalize_key(s: str) -> str:
     """
     For dedupe/keys: lowercase, remove diacritics, collapse spaces, keep letters/numbers.
     """
-    s = unidecode(s).lower()
-    s = re.sub(r"[^a-z0-9\s]+", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    t = s.lower().translate(_VN_TABLE)
+    if not t.isascii():
+        # Non-Vietnamese letters or decomposed (NFD) accents: let unidecode handle it
+        t = unidecode(s).lower()
+    return _WS.sub(" ", _NON_ALNUM.sub(" ", t)).strip()
 
 
-def dedupe_lines(lines: List[str], threshold: int = 92) -> List[str]:
+def _len_window(n: int, threshold: int) -> Tuple[int, int]:
+    """
+    Lengths a string may have and still reach `threshold` fuzzy ratio against one of length n
+    (ratio <= 2*min/(len_a+len_b)*100).
+    """
+    if threshold <= 0:
+        return 0, 1 << 62
+    return -(-threshold * n // (200 - threshold)), n * (200 - threshold) // threshold
+
+
+def dedupe_lines(lines: List[T], threshold: int = 92, key: Optional[Callable[[T], str]] = None) -> List[T]:
     """
     Remove near-duplicates using fuzzy ratio.
     threshold 0-100, higher = stricter.
+    key extracts the text to compare when lines are not plain strings.
     """
-    kept: List[str] = []
-    kept_norm: List[str] = []
+    # rapidfuzz only accepts score_cutoff in 0-100; ratio is never above 100, so a higher
+    # threshold marks nothing as duplicate and a negative one behaves like 0.
+    if threshold > 100:
+        return [line for line in lines if normalize_key(key(line) if key else line)]
+    threshold = max(threshold, 0)
+
+    kept: List[T] = []
+    # kept keys grouped by len // _LEN_BUCKET, so only buckets inside the length window are visited
+    buckets: Dict[int, List[str]] = defaultdict(list)
+    longest = 0
     for line in lines:
-        n = normalize_key(line)
+        n = normalize_key(key(line) if key else line)
         if not n:
             continue
-        is_dup = False
-        for kn in kept_norm:
-            if fuzz.ratio(n, kn) >= threshold:
-                is_dup = True
-                break
-        if not is_dup:
+        # Only keys whose length can still reach the threshold are scored;
+        # score_cutoff lets rapidfuzz stop early once the edit budget is exceeded.
+        lo, hi = _len_window(len(n), threshold)
+        hi = min(hi, longest)
+        candidates = [
+            kn
+            for b in range(lo // _LEN_BUCKET, hi // _LEN_BUCKET + 1)
+            for kn in buckets.get(b, ())
+            if lo <= len(kn) <= hi
+        ]
+        if process.extractOne(n, candidates, scorer=fuzz.ratio, processor=None, score_cutoff=threshold) is None:
             kept.append(line)
-            kept_norm.append(n)
+            buckets[len(n) // _LEN_BUCKET].append(n)
+            longest = max(longest, len(n))
     return kept
 
 
@@ -68,7 +123,8 @@ def build_evidence_pack(
       - ocr_compact: list[str]
       - stt_compact: list[str]
     """
-    lines: List[str] = []
+    # (start_sec, line) so the chronological sort needs no re-parsing of the prefix
+    lines: List[Tuple[float, str]] = []
 
     # OCR first (your primary signal)
     for it in ocr_items:
@@ -78,7 +134,7 @@ def build_evidence_pack(
         if not text:
             continue
         prefix = f"[OCR {_fmt_ts(it.start_sec)}-{_fmt_ts(it.end_sec)} conf={it.confidence if it.confidence is not None else 'NA'}]"
-        lines.append(f"{prefix} {text}")
+        lines.append((it.start_sec if it.start_sec is not None else 1e9, f"{prefix} {text}"))
 
     # Whisper STT second
     for s in stt_segments:
@@ -86,37 +142,35 @@ def build_evidence_pack(
         if not text:
             continue
         prefix = f"[STT {_fmt_ts(s.start_sec)}-{_fmt_ts(s.end_sec)}]"
-        lines.append(f"{prefix} {text}")
+        lines.append((s.start_sec if s.start_sec is not None else 1e9, f"{prefix} {text}"))
 
     # Dedupe & truncate
-    lines = dedupe_lines(lines, threshold=dedupe_threshold)
+    lines = dedupe_lines(lines, threshold=dedupe_threshold, key=itemgetter(1))
 
-    # Keep in chronological-ish order by timestamp in bracket (rough sort)
-    def sort_key(line: str) -> float:
-        m = re.search(r"\[(?:OCR|STT)\s+(\d{2}):(\d{2}\.\d)\-", line)
-        if not m:
-            return 1e9
-        mm = int(m.group(1))
-        ss = float(m.group(2))
-        return mm * 60 + ss
+    # Keep in chronological order (unknown timestamps last). All keys are floats, so
+    # Timsort uses CPython's specialised float compare; it is stable, so OCR stays ahead
+    # of STT on equal start times.
+    lines.sort(key=itemgetter(0))
 
-    lines.sort(key=sort_key)
+    # Cut at the last line whose running length (+1 per newline) still fits max_chars
+    cum = list(accumulate(len(line) + 1 for _, line in lines))
+    out_lines = [line for _, line in lines[: bisect_right(cum, max_chars)]]
 
-    out_lines: List[str] = []
-    total = 0
-    for line in lines:
-        if total + len(line) + 1 > max_chars:
-            break
-        out_lines.append(line)
-        total += len(line) + 1
+    # Split OCR/STT (compact raw fields for Notion) in one pass; the full text is one C-level join
+    ocr_lines: List[str] = []
+    stt_lines: List[str] = []
+    for line in out_lines:
+        (ocr_lines if line[1:4] == "OCR" else stt_lines).append(line)
+    evidence_text = "\n".join(out_lines)
 
-    # Also keep compact raw text chunks (useful for Notion raw fields)
-    ocr_compact = [l for l in out_lines if l.startswith("[OCR ")]
-    stt_compact = [l for l in out_lines if l.startswith("[STT ")]
+    # out_lines already fit max_chars, so each compact field does too; when only one
+    # source survived it is identical to evidence_text and needs no second join.
+    ocr_compact = evidence_text if not stt_lines else "\n".join(ocr_lines)
+    stt_compact = evidence_text if not ocr_lines else "\n".join(stt_lines)
 
     return {
         "evidence_lines": out_lines,
-        "evidence_text": "\n".join(out_lines),
-        "ocr_compact": "\n".join(ocr_compact)[:max_chars],
-        "stt_compact": "\n".join(stt_compact)[:max_chars],
+        "evidence_text": evidence_text,
+        "ocr_compact": ocr_compact,
+        "stt_compact": stt_compact,
     }
@@ -1,11 +1,25 @@
 # llm_extract.py
 from __future__ import annotations
 
+import asyncio
+import functools
 import json
 import os
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+
+# Reused across calls so its httpx keep-alive pool survives between videos
+_CLIENT: Optional[OpenAI] = None
+
+
+def _client(api_key: str) -> OpenAI:
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.api_key != api_key:
+        _CLIENT = OpenAI(api_key=api_key)
+    return _CLIENT
 
 
 def get_extraction_schema() -> Dict[str, Any]:
@@ -81,15 +95,12 @@ def get_extraction_schema() -> Dict[str, Any]:
     }
 
 
-def extract_structured(
-    *,
-    video: Dict[str, Any],
-    evidence_text: str,
-    model: Optional[str] = None,
-) -> Dict[str, Any]:
-    """
-    Returns parsed JSON dict (schema guaranteed by Structured Outputs).
-    """
+@functools.lru_cache(maxsize=1)
+def _schema() -> Dict[str, Any]:
+    return get_extraction_schema()
+
+
+def _api_settings(model: Optional[str]) -> Tuple[str, str]:
     provider = os.getenv("LLM_PROVIDER", "openai").lower()
     if provider != "openai":
         raise RuntimeError("This MVP implements LLM_PROVIDER=openai only. (Add others later.)")
@@ -98,12 +109,13 @@ def extract_structured(
     if not api_key:
         raise RuntimeError("Missing OPENAI_API_KEY in .env")
 
-    model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    return api_key, model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
-    client = OpenAI(api_key=api_key)
-
-    schema = get_extraction_schema()
 
+def _request_body(video: Dict[str, Any], evidence_text: str, model: str) -> Dict[str, Any]:
+    """
+    Responses API request body, shared by the sync, async and batch paths.
+    """
     system = (
         "You extract Vietnamese Đà Nẵng food info from TikTok-style videos.\n"
         "PRIMARY signal: OCR lines (on-screen text).\n"
@@ -124,24 +136,136 @@ def extract_structured(
     )
 
     # Structured Outputs via Responses API: text.format json_schema strict. :contentReference[oaicite:1]{index=1}
-    resp = client.responses.create(
-        model=model,
-        input=[
+    return {
+        "model": model,
+        "input": [
             {"role": "system", "content": system},
             {"role": "user", "content": user},
         ],
-        text={
+        "text": {
             "format": {
                 "type": "json_schema",
                 "name": "danang_food_extraction",
                 "strict": True,
-                "schema": schema,
+                "schema": _schema(),
             }
         },
-    )
+    }
 
-    out_text = resp.output_text
+
+def _parse_output(out_text: Optional[str]) -> Dict[str, Any]:
     if not out_text:
         raise RuntimeError("OpenAI returned empty output_text")
-
     return json.loads(out_text)
+
+
+def extract_structured(
+    *,
+    video: Dict[str, Any],
+    evidence_text: str,
+    model: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Returns parsed JSON dict (schema guaranteed by Structured Outputs).
+    """
+    api_key, model = _api_settings(model)
+    resp = _client(api_key).responses.create(**_request_body(video, evidence_text, model))
+    return _parse_output(resp.output_text)
+
+
+async def extract_structured_async(
+    videos: List[Tuple[Dict[str, Any], str]],
+    *,
+    model: Optional[str] = None,
+    concurrency: int = 8,
+) -> List[Dict[str, Any]]:
+    """
+    Online multi-video extraction: one request per (video, evidence_text), at most
+    `concurrency` in flight. Results are in input order; the first failure is raised.
+    Call from sync code with asyncio.run(...).
+    """
+    api_key, model = _api_settings(model)
+    sem = asyncio.Semaphore(concurrency)
+
+    async with AsyncOpenAI(api_key=api_key) as client:
+
+        async def one(video: Dict[str, Any], evidence_text: str) -> Dict[str, Any]:
+            async with sem:
+                resp = await client.responses.create(**_request_body(video, evidence_text, model))
+            return _parse_output(resp.output_text)
+
+        tasks = [asyncio.ensure_future(one(v, ev)) for v, ev in videos]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            # gather doesn't cancel siblings: stop them (and collect their outcomes) before the
+            # client closes, so nothing runs against a closed client or goes unretrieved
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+
+def _batch_output_text(body: Dict[str, Any]) -> Optional[str]:
+    # Raw Responses JSON has no output_text convenience field; collect it from the message parts
+    parts = []
+    for item in body.get("output") or []:
+        if item.get("type") != "message":
+            continue
+        for c in item.get("content") or []:
+            if c.get("type") == "output_text" and c.get("text"):
+                parts.append(c["text"])
+    return "".join(parts) or None
+
+
+def extract_structured_batch(
+    videos: List[Tuple[Dict[str, Any], str]],
+    *,
+    model: Optional[str] = None,
+    poll_sec: float = 30.0,
+) -> List[Dict[str, Any]]:
+    """
+    Offline multi-video extraction via the Batch API (/v1/batches, ~50% cheaper, up to 24h).
+    Uploads one JSONL request per (video, evidence_text), polls until the batch finishes and
+    returns parsed results in input order.
+    """
+    api_key, model = _api_settings(model)
+    client = _client(api_key)
+
+    jsonl = "".join(
+        json.dumps(
+            {"custom_id": str(i), "method": "POST", "url": "/v1/responses", "body": _request_body(v, ev, model)},
+            ensure_ascii=False,
+        )
+        + "\n"
+        for i, (v, ev) in enumerate(videos)
+    )
+    input_file = client.files.create(file=("extraction_batch.jsonl", jsonl.encode("utf-8")), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/responses",
+        completion_window="24h",
+    )
+
+    while batch.status in ("validating", "in_progress", "finalizing"):
+        time.sleep(poll_sec)
+        batch = client.batches.retrieve(batch.id)
+
+    if batch.status != "completed" or not batch.output_file_id:
+        raise RuntimeError(f"OpenAI batch {batch.id} ended with status {batch.status}")
+
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        resp = row.get("response") or {}
+        if row.get("error") or resp.get("status_code") != 200:
+            raise RuntimeError(f"OpenAI batch request {row.get('custom_id')} failed: {row.get('error') or resp}")
+        by_id[row["custom_id"]] = _parse_output(_batch_output_text(resp.get("body") or {}))
+
+    missing = [str(i) for i in range(len(videos)) if str(i) not in by_id]
+    if missing:
+        raise RuntimeError(f"OpenAI batch {batch.id} returned no result for requests: {', '.join(missing)}")
+
+    return [by_id[str(i)] for i in range(len(videos))]
@@ -2,18 +2,27 @@
 from __future__ import annotations
 
 import os
+import random
 import time
 import json
 import hashlib
-from dataclasses import dataclass
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypeVar
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 
 
 NOTION_API = "https://api.notion.com/v1"
 
+T = TypeVar("T")
+R = TypeVar("R")
+
 
 def require_env(name: str) -> str:
     v = os.getenv(name)
@@ -29,6 +38,28 @@ def truncate(s: str, limit: int) -> str:
     return s[: max(0, limit - 20)] + "\n\n[TRUNCATED]"
 
 
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date); None if absent or malformed."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class NotionConflictError(RuntimeError):
+    """409 from Notion: the page changed under us; re-query and re-merge before writing again."""
+
+
+@functools.lru_cache(maxsize=4096)
 def stable_hash(s: str) -> str:
     return hashlib.sha1(s.encode("utf-8")).hexdigest()[:12]
 
@@ -39,6 +70,13 @@ class NotionClient:
     version: str = "2022-06-28"
     timeout_sec: int = 30
     max_retries: int = 6
+    _session: requests.Session = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        # One keep-alive session per client: skips a TCP+TLS handshake on every call
+        self._session = requests.Session()
+        self._session.headers.update(self._headers())
+        self._session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=0))
 
     def _headers(self) -> Dict[str, str]:
         return {
@@ -52,32 +90,32 @@ class NotionClient:
         backoff = 0.8
 
         for attempt in range(1, self.max_retries + 1):
-            resp = requests.request(
+            # orjson on both ends: faster than stdlib json for large DB scans / raw-text payloads
+            resp = self._session.request(
                 method=method,
                 url=url,
-                headers=self._headers(),
-                json=payload,
+                data=orjson.dumps(payload) if payload is not None else None,
                 timeout=self.timeout_sec,
             )
 
             # success
             if 200 <= resp.status_code < 300:
-                return resp.json()
-
-            # rate limited (429): respect Retry-After. :contentReference[oaicite:3]{index=3}
-            if resp.status_code == 429:
-                retry_after = resp.headers.get("Retry-After")
-                sleep_s = float(retry_after) if retry_after else backoff
+                return orjson.loads(resp.content)
+
+            # conflict: re-sending this body could overwrite the concurrent write; callers re-query
+            if resp.status_code == 409:
+                raise NotionConflictError(f"Notion API conflict {resp.status_code}: {resp.text}")
+
+            # rate limited (429) or transient server errors: respect Retry-After whenever it is
+            # sent, else full-jitter backoff so concurrent upserts don't retry in lockstep.
+            # :contentReference[oaicite:3]{index=3}
+            if resp.status_code in (429, 500, 502, 503, 504):
+                retry_after = retry_after_seconds(resp.headers.get("Retry-After"))
+                sleep_s = retry_after if retry_after is not None else random.uniform(0, backoff)
                 time.sleep(sleep_s)
                 backoff = min(backoff * 2, 8.0)
                 continue
 
-            # transient server errors
-            if resp.status_code in (500, 502, 503, 504):
-                time.sleep(backoff)
-                backoff = min(backoff * 2, 8.0)
-                continue
-
             # permanent error
             raise RuntimeError(f"Notion API error {resp.status_code}: {resp.text}")
 
@@ -89,6 +127,19 @@ class NotionClient:
         res = self.request("POST", f"/databases/{database_id}/query", {"filter": filter_obj})
         return res.get("results", [])
 
+    def scan_database(self, database_id: str, page_size: int = 100) -> List[Dict[str, Any]]:
+        """
+        Every page in the database, following start_cursor pagination.
+        """
+        pages: List[Dict[str, Any]] = []
+        payload: Dict[str, Any] = {"page_size": page_size}
+        while True:
+            res = self.request("POST", f"/databases/{database_id}/query", payload)
+            pages.extend(res.get("results", []))
+            if not res.get("has_more") or not res.get("next_cursor"):
+                return pages
+            payload["start_cursor"] = res["next_cursor"]
+
     def retrieve_page(self, page_id: str) -> Dict[str, Any]:
         return self.request("GET", f"/pages/{page_id}")
 
@@ -130,6 +181,29 @@ class NotionClient:
         return {"relation": [{"id": pid} for pid in page_ids if pid]}
 
 
+def prop_plain_text(page: Dict[str, Any], prop: str) -> str:
+    """
+    Plain text of a title / rich_text property, from either an API page or the
+    property dicts built by NotionClient.prop_title / prop_text.
+    """
+    v = (page.get("properties") or {}).get(prop) or {}
+    parts = v.get("title") or v.get("rich_text") or []
+    return "".join(x.get("plain_text") or (x.get("text") or {}).get("content") or "" for x in parts)
+
+
+def index_pages(pages: List[Dict[str, Any]], prop: str) -> Dict[str, Dict[str, Any]]:
+    """
+    {plain text of prop -> page}, first page wins (same as results[0] of an equals query).
+    Pass to the upsert_* functions to answer lookups without a query round-trip.
+    """
+    out: Dict[str, Dict[str, Any]] = {}
+    for page in pages:
+        key = prop_plain_text(page, prop)
+        if key:
+            out.setdefault(key, page)
+    return out
+
+
 # --- UPSERTS tailored to YOUR Notion schema --- #
 
 @dataclass
@@ -187,6 +261,19 @@ def load_notion_ids_from_env() -> NotionDBIds:
     )
 
 
+def requery_on_conflict(upsert: Callable[[bool], R], attempts: int = 3) -> R:
+    """
+    Runs upsert(fresh) and, on a 409, re-runs the whole query -> merge -> write with
+    fresh=True (ignore any prefetched copy) after a short jittered pause.
+    """
+    for attempt in range(attempts - 1):
+        try:
+            return upsert(attempt > 0)
+        except NotionConflictError:
+            time.sleep(random.uniform(0, 0.5 * 2 ** attempt))
+    return upsert(True)
+
+
 def upsert_video(
     notion: NotionClient,
     db: NotionDBIds,
@@ -235,43 +322,52 @@ def upsert_dish(
     canonical: str,
     aliases: List[str],
     category: Optional[str],
+    index: Optional[Dict[str, Dict[str, Any]]] = None,
 ) -> str:
-    # Query by title equals canonical
-    results = notion.query_database(
-        db.dishes,
-        {"property": props.dish_title, "title": {"equals": canonical}},
-    )
-
-    # Merge aliases if existing
-    merged_aliases = list(dict.fromkeys([a.strip() for a in aliases if a and a.strip()]))
-
-    p: Dict[str, Any] = {
-        props.dish_title: notion.prop_title(canonical),
-        props.dish_aliases: notion.prop_multi_select(merged_aliases),
-    }
-    if category:
-        p[props.dish_category] = notion.prop_select(category)
-
-    if results:
-        page_id = results[0]["id"]
-        # Best-effort merge with existing aliases
-        try:
-            existing = notion.retrieve_page(page_id)
-            existing_aliases = []
-            ms = existing.get("properties", {}).get(props.dish_aliases, {}).get("multi_select", [])
-            for x in ms:
-                name = x.get("name")
-                if name:
-                    existing_aliases.append(name)
-            merged = list(dict.fromkeys(existing_aliases + merged_aliases))
-            p[props.dish_aliases] = notion.prop_multi_select(merged)
-        except Exception:
-            pass
-
-        notion.update_page(page_id, p)
+    def once(fresh: bool) -> str:
+        # Query by title equals canonical, unless a prefetched index already has it
+        # (never after a conflict: the cached properties are stale then)
+        cached = index.get(canonical) if index is not None and not fresh else None
+        results = [cached] if cached else notion.query_database(
+            db.dishes,
+            {"property": props.dish_title, "title": {"equals": canonical}},
+        )
+
+        # Merge aliases if existing
+        merged_aliases = list(dict.fromkeys([a.strip() for a in aliases if a and a.strip()]))
+
+        p: Dict[str, Any] = {
+            props.dish_title: notion.prop_title(canonical),
+            props.dish_aliases: notion.prop_multi_select(merged_aliases),
+        }
+        if category:
+            p[props.dish_category] = notion.prop_select(category)
+
+        if results:
+            page_id = results[0]["id"]
+            # Best-effort merge with existing aliases (query results already carry properties)
+            try:
+                existing = results[0]
+                existing_aliases = []
+                ms = existing.get("properties", {}).get(props.dish_aliases, {}).get("multi_select", [])
+                for x in ms:
+                    name = x.get("name")
+                    if name:
+                        existing_aliases.append(name)
+                merged = list(dict.fromkeys(existing_aliases + merged_aliases))
+                p[props.dish_aliases] = notion.prop_multi_select(merged)
+            except Exception:
+                pass
+
+            notion.update_page(page_id, p)
+        else:
+            page_id = notion.create_page(db.dishes, p)
+
+        if index is not None:
+            index[canonical] = {"id": page_id, "properties": p}
         return page_id
 
-    return notion.create_page(db.dishes, p)
+    return requery_on_conflict(once)
 
 
 def upsert_place(
@@ -287,54 +383,64 @@ def upsert_place(
     price_range: Optional[str],
     description: Optional[str],
     tiktok_handle: Optional[str],
+    index: Optional[Dict[str, Dict[str, Any]]] = None,
 ) -> str:
-    # Prefer (Name AND Address) if address exists, else Name only
-    if address:
-        filter_obj = {
-            "and": [
-                {"property": props.place_title, "title": {"equals": name}},
-                {"property": props.place_address, "rich_text": {"equals": address}},
-            ]
+    def once(fresh: bool) -> str:
+        # Prefer (Name AND Address) if address exists, else Name only
+        if address:
+            filter_obj = {
+                "and": [
+                    {"property": props.place_title, "title": {"equals": name}},
+                    {"property": props.place_address, "rich_text": {"equals": address}},
+                ]
+            }
+        else:
+            filter_obj = {"property": props.place_title, "title": {"equals": name}}
+
+        cached = index.get(name) if index is not None and not fresh else None
+        if cached and address and prop_plain_text(cached, props.place_address) != address:
+            cached = None
+        results = [cached] if cached else notion.query_database(db.places, filter_obj)
+
+        p: Dict[str, Any] = {
+            props.place_title: notion.prop_title(name),
+            props.place_dish_rel: notion.prop_relation(dish_ids),
         }
-    else:
-        filter_obj = {"property": props.place_title, "title": {"equals": name}}
-
-    results = notion.query_database(db.places, filter_obj)
-
-    p: Dict[str, Any] = {
-        props.place_title: notion.prop_title(name),
-        props.place_dish_rel: notion.prop_relation(dish_ids),
-    }
-    if address:
-        p[props.place_address] = notion.prop_text(address)
-    if district:
-        p[props.place_district] = notion.prop_select(district)
-    if hours:
-        p[props.place_hours] = notion.prop_text(hours)
-    if price_range:
-        p[props.place_price] = notion.prop_select(price_range)
-    if description:
-        p[props.place_desc] = notion.prop_text(description)
-    if tiktok_handle:
-        p[props.place_handle] = notion.prop_text(tiktok_handle)
-
-    if results:
-        page_id = results[0]["id"]
-
-        # Merge relation Dish (union)
-        try:
-            existing = notion.retrieve_page(page_id)
-            existing_rel = existing.get("properties", {}).get(props.place_dish_rel, {}).get("relation", [])
-            existing_ids = [x.get("id") for x in existing_rel if x.get("id")]
-            union_ids = list(dict.fromkeys(existing_ids + dish_ids))
-            p[props.place_dish_rel] = notion.prop_relation(union_ids)
-        except Exception:
-            pass
-
-        notion.update_page(page_id, p)
+        if address:
+            p[props.place_address] = notion.prop_text(address)
+        if district:
+            p[props.place_district] = notion.prop_select(district)
+        if hours:
+            p[props.place_hours] = notion.prop_text(hours)
+        if price_range:
+            p[props.place_price] = notion.prop_select(price_range)
+        if description:
+            p[props.place_desc] = notion.prop_text(description)
+        if tiktok_handle:
+            p[props.place_handle] = notion.prop_text(tiktok_handle)
+
+        if results:
+            page_id = results[0]["id"]
+
+            # Merge relation Dish (union) from the queried page's properties
+            try:
+                existing = results[0]
+                existing_rel = existing.get("properties", {}).get(props.place_dish_rel, {}).get("relation", [])
+                existing_ids = [x.get("id") for x in existing_rel if x.get("id")]
+                union_ids = list(dict.fromkeys(existing_ids + dish_ids))
+                p[props.place_dish_rel] = notion.prop_relation(union_ids)
+            except Exception:
+                pass
+
+            notion.update_page(page_id, p)
+        else:
+            page_id = notion.create_page(db.places, p)
+
+        if index is not None:
+            index[name] = {"id": page_id, "properties": p}
         return page_id
 
-    return notion.create_page(db.places, p)
+    return requery_on_conflict(once)
 
 
 def create_or_get_mention(
@@ -383,6 +489,20 @@ def create_or_get_mention(
     return notion.create_page(db.mentions, p)
 
 
+def map_concurrent(fn: Callable[[T], R], items: Iterable[T], max_workers: int = 3) -> List[R]:
+    """
+    Runs fn over items on a small thread pool (Notion calls are I/O bound) and
+    returns results in input order. The first exception is re-raised.
+    Keep max_workers low: Notion averages ~3 requests/s per integration and
+    request() already backs off on 429.
+    """
+    items = list(items)
+    if len(items) <= 1 or max_workers <= 1:
+        return [fn(x) for x in items]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(fn, items))
+
+
 def compute_mention_score(confidence: float, has_place: bool, has_address: bool, has_hours: bool) -> float:
     """
     Simple starter scoring. You can later swap to your exact formula.
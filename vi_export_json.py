@@ -1,6 +1,8 @@
-import os, time, json, subprocess
+import os, time, subprocess, functools
 from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
 
+import orjson
 import requests
 from dotenv import load_dotenv
 from azure.storage.blob import (
@@ -47,21 +49,45 @@ def vi_access_token(subscription_id: str, rg: str, vi_account_name: str) -> str:
         f"/generateAccessToken?api-version={API_VERSION}"
     )
     body = {"permissionType": "Contributor", "scope": "Account"}
-    r = requests.post(url, headers={"Authorization": f"Bearer {mgmt_token}"}, json=body, timeout=60)
+    r = requests.post(
+        url,
+        headers={"Authorization": f"Bearer {mgmt_token}", "Content-Type": "application/json"},
+        data=orjson.dumps(body),
+        timeout=60,
+    )
     r.raise_for_status()
-    return r.json()["accessToken"]
+    return orjson.loads(r.content)["accessToken"]
+
+@functools.lru_cache(maxsize=4)
+def _parse_conn(conn_str: str) -> Dict[str, str]:
+    return dict(p.split("=", 1) for p in conn_str.split(";") if "=" in p)
+
+
+@functools.lru_cache(maxsize=4)
+def _blob_service(conn_str: str) -> BlobServiceClient:
+    # One client per connection string so its connection pool survives across uploads
+    return BlobServiceClient.from_connection_string(conn_str)
+
 
 def upload_to_blob_and_get_sas(conn_str: str, container: str, video_path: str) -> str:
-    bsc = BlobServiceClient.from_connection_string(conn_str)
+    bsc = _blob_service(conn_str)
     blob_name = f"uploads/{int(time.time())}_{os.path.basename(video_path)}"
     blob_client = bsc.get_blob_client(container=container, blob=blob_name)
 
+    # Known length + max_concurrency: the SDK splits the file into blocks and uploads them
+    # over parallel connections instead of one sequential stream.
     with open(video_path, "rb") as f:
-        blob_client.upload_blob(f, overwrite=True)
+        blob_client.upload_blob(
+            f,
+            overwrite=True,
+            blob_type="BlockBlob",
+            length=os.path.getsize(video_path),
+            max_concurrency=int(os.getenv("AZ_UPLOAD_CONCURRENCY", "8")),
+        )
 
     # MVP SAS using account key from connection string
     account_name = bsc.account_name
-    account_key = [p.split("=", 1)[1] for p in conn_str.split(";") if p.startswith("AccountKey=")][0]
+    account_key = _parse_conn(conn_str)["AccountKey"]
 
     sas = generate_blob_sas(
         account_name=account_name,
@@ -92,20 +118,40 @@ def vi_upload_and_index(location: str, account_id: str, api_key: str, bearer: st
     }
     r = requests.post(base, headers=headers, params=params, timeout=120)
     r.raise_for_status()
-    return r.json()["id"]
-
-def vi_get_index(location: str, account_id: str, api_key: str, bearer: str, video_id: str) -> dict:
+    return orjson.loads(r.content)["id"]
+
+def vi_get_index(
+    location: str, account_id: str, api_key: str, bearer: str, video_id: str, etag: Optional[str] = None
+) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Returns (index, etag). With `etag` from a previous call the request is conditional:
+    an unchanged index comes back as 304 and is returned as (None, etag) without a body to parse.
+    """
     url = f"https://api.videoindexer.ai/{location}/Accounts/{account_id}/Videos/{video_id}/Index"
     headers = {
         "Authorization": f"Bearer {bearer}",
         "Ocp-Apim-Subscription-Key": api_key,
     }
+    if etag:
+        headers["If-None-Match"] = etag
     r = requests.get(url, headers=headers, timeout=120)
+    if r.status_code == 304:
+        return None, etag
     if r.status_code >= 400:
         print("Status:", r.status_code)
 
     r.raise_for_status()
-    return r.json()
+    # Index payloads run to tens of MB for long videos; orjson parses them several times faster
+    return orjson.loads(r.content), r.headers.get("ETag")
+
+
+def _poll_delay(progress) -> float:
+    # processingProgress looks like "45%": poll often near the end, back off while far from done
+    try:
+        pct = float(str(progress).strip().rstrip("%"))
+    except ValueError:
+        pct = 0.0
+    return max(5.0, min(30.0, (100.0 - pct) * 0.3))
 
 def main():
     load_dotenv()
@@ -135,24 +181,27 @@ def main():
     print("   videoId:", video_id)
 
     print("4) Polling until processed…")
+    data: dict = {}
+    etag = None
     while True:
 
-        data = vi_get_index(location, account_id, api_key, bearer, video_id)
-        state = data.get("state")
-        if state == "Failed":
-            v = (data.get("videos") or [{}])[0]
-            print("failureCode:", v.get("failureCode"))
-            print("failureMessage:", v.get("failureMessage"))
-            break
-        progress = data.get("processingProgress")
-        print(f"   state={state} progress={progress}")
-        if state in ("Processed", "Failed"):
-            break
-        time.sleep(15)
+        fresh, etag = vi_get_index(location, account_id, api_key, bearer, video_id, etag=etag)
+        if fresh is not None:
+            data = fresh
+            state = data.get("state")
+            if state == "Failed":
+                v = (data.get("videos") or [{}])[0]
+                print("failureCode:", v.get("failureCode"))
+                print("failureMessage:", v.get("failureMessage"))
+                break
+            print(f"   state={state} progress={data.get('processingProgress')}")
+            if state in ("Processed", "Failed"):
+                break
+        time.sleep(_poll_delay(data.get("processingProgress")))
 
     out = f"insights_{video_id}.json"
-    with open(out, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    with open(out, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
 
     print("5) Saved:", out)
     print("Done.")
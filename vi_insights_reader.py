@@ -1,34 +1,58 @@
 # vi_insights_reader.py
 from __future__ import annotations
 
-import json
+from bisect import bisect_right
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import accumulate, chain
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import ijson
+import orjson
+
+# Files at/above this size are streamed with ijson instead of parsed whole.
+_LAZY_MIN_BYTES = 8_000_000
+
+# Fields read downstream (here and in vi_json_to_notion); everything else is skipped.
+_LAZY_TOP = ("id", "name", "created", "duration", "durationInSeconds")
+_LAZY_VIDEO = ("id", "name", "videoName")
+_LAZY_VIDEO_INSIGHTS = ("ocr", "transcript", "keywords", "labels", "topics", "sentiments", "duration")
+_LAZY_SUMMARY = ("id", "name", "created", "duration", "ocr", "keywords", "labels", "topics", "sentiments")
+
+
+@lru_cache(maxsize=1 << 15)
+def _tc_to_sec(tc: str) -> Optional[float]:
+    # "h:mm:ss.fff" or "m:ss.fff"; colons located with find() instead of split() (no list alloc).
+    # Cached: VI repeats the same timecodes across items/instances ("0:00:00", ...).
+    i = tc.find(":")
+    if i < 0:
+        return None
+    j = tc.find(":", i + 1)
+    try:
+        if j < 0:
+            return int(tc[:i]) * 60 + float(tc[i + 1 :])
+        if tc.find(":", j + 1) >= 0:
+            return None
+        return int(tc[:i]) * 3600 + int(tc[i + 1 : j]) * 60 + float(tc[j + 1 :])
+    except ValueError:
+        return None
 
 
 def timecode_to_seconds(tc: str) -> Optional[float]:
     """
     Video Indexer timestamps look like:
-      "0:00:03.0333333"  or  "0:00:02.44"
+      "0:00:03.0333333"  or  "0:00:02.44"  (also accepts "m:ss.f")
     Returns seconds as float.
     """
     if not tc or not isinstance(tc, str):
         return None
-    try:
-        parts = tc.split(":")
-        if len(parts) != 3:
-            return None
-        h = int(parts[0])
-        m = int(parts[1])
-        s = float(parts[2])
-        return h * 3600 + m * 60 + s
-    except Exception:
-        return None
+    return _tc_to_sec(tc)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TimedText:
+    # slots: one instance per (OCR item x instance); no per-object __dict__
     source: str  # "ocr" or "vi_transcript"
     text: str
     start_sec: Optional[float]
@@ -37,9 +61,75 @@ class TimedText:
 
 
 def read_insights_json(path: str | Path) -> Dict[str, Any]:
-    p = Path(path)
-    with p.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    path = Path(path)
+    if path.stat().st_size >= _LAZY_MIN_BYTES:
+        return read_insights_json_lazy(path)
+    # orjson parses multi-MB insights files several times faster than stdlib json
+    return orjson.loads(path.read_bytes())
+
+
+def read_insights_json_lazy(path: str | Path) -> Dict[str, Any]:
+    """
+    Streams the insights file with ijson and keeps only the fields the pipeline reads
+    (top-level metadata, videos[0] + its insights sections, summarizedInsights, and a
+    top-level "insights" object for inputs that are already the inner shape).
+    Returns a dict in the same shape as the full document, minus everything else.
+    """
+    out: Dict[str, Any] = {}
+    video: Dict[str, Any] = {}
+    vi: Dict[str, Any] = {}
+    summary: Dict[str, Any] = {}
+    inner: Dict[str, Any] = {}
+
+    wanted: Dict[str, Tuple[Dict[str, Any], str]] = {k: (out, k) for k in _LAZY_TOP}
+    wanted.update({f"videos.item.{k}": (video, k) for k in _LAZY_VIDEO})
+    wanted.update({f"videos.item.insights.{k}": (vi, k) for k in _LAZY_VIDEO_INSIGHTS})
+    wanted.update({f"summarizedInsights.{k}": (summary, k) for k in _LAZY_SUMMARY})
+    wanted.update({f"insights.{k}": (inner, k) for k in _LAZY_VIDEO_INSIGHTS})
+
+    videos_seen = 0
+    builder: Optional[ijson.ObjectBuilder] = None
+    depth = 0
+    dest: Optional[Tuple[Dict[str, Any], str]] = None
+
+    with open(path, "rb") as f:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if event == "start_map" or event == "start_array":
+                    depth += 1
+                elif event == "end_map" or event == "end_array":
+                    depth -= 1
+                    if depth == 0:
+                        dest[0][dest[1]] = builder.value
+                        builder = None
+                continue
+
+            if event == "map_key":
+                continue
+            if prefix == "videos.item" and event == "start_map":
+                videos_seen += 1
+                continue
+            dest = wanted.get(prefix)
+            if dest is None or (videos_seen != 1 and prefix.startswith("videos.item.")):
+                continue
+
+            if event == "start_map" or event == "start_array":
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+                depth = 1
+            else:
+                dest[0][dest[1]] = value
+
+    if vi:
+        video["insights"] = vi
+    if video:
+        out["videos"] = [video]
+    if summary:
+        out["summarizedInsights"] = summary
+    if inner:
+        out["insights"] = inner
+    return out
 
 
 def get_vi_metadata(insights: Dict[str, Any]) -> Dict[str, Any]:
@@ -60,6 +150,46 @@ def _get_primary_video_insights(insights: Dict[str, Any]) -> Dict[str, Any]:
     return {}
 
 
+def _expand(item: Any, source: str, min_conf: float) -> Tuple[TimedText, ...]:
+    """
+    One VI ocr/transcript item -> one TimedText per instance,
+    or one untimed TimedText when the item has no instances.
+    """
+    if not isinstance(item, dict):
+        return ()
+    # confidence first: items dropped by min_conf never pay for strip()
+    conf = item.get("confidence")
+    try:
+        conf_f = float(conf) if conf is not None else None
+    except Exception:
+        conf_f = None
+
+    if conf_f is not None and conf_f < min_conf:
+        return ()
+    raw = item.get("text")
+    if not raw:
+        return ()
+    text = raw.strip()
+    if not text:
+        return ()
+
+    instances = item.get("instances") or []
+    if isinstance(instances, list) and instances:
+        return tuple(
+            TimedText(source, text, timecode_to_seconds(inst.get("start")), timecode_to_seconds(inst.get("end")), conf_f)
+            for inst in instances
+            if isinstance(inst, dict)
+        )
+    return (TimedText(source, text, None, None, conf_f),)
+
+
+def _iter_items(items: Any, source: str, min_conf: float) -> Iterator[TimedText]:
+    # Shared walk for VI ocr/transcript lists; callers materialize with a single list()
+    if not isinstance(items, list):
+        return iter(())
+    return chain.from_iterable(_expand(item, source, min_conf) for item in items)
+
+
 def extract_ocr_items(insights: Dict[str, Any], min_conf: float = 0.0) -> List[TimedText]:
     """
     Prefers videos[0].insights.ocr; falls back to summarizedInsights.ocr
@@ -69,87 +199,19 @@ def extract_ocr_items(insights: Dict[str, Any], min_conf: float = 0.0) -> List[T
     ocr = vi.get("ocr")
     if not ocr:
         ocr = (insights.get("summarizedInsights") or {}).get("ocr") or []
-
-    out: List[TimedText] = []
-    if not isinstance(ocr, list):
-        return out
-
-    for item in ocr:
-        if not isinstance(item, dict):
-            continue
-        text = (item.get("text") or "").strip()
-        if not text:
-            continue
-        conf = item.get("confidence")
-        try:
-            conf_f = float(conf) if conf is not None else None
-        except Exception:
-            conf_f = None
-
-        if conf_f is not None and conf_f < min_conf:
-            continue
-
-        instances = item.get("instances") or []
-        if isinstance(instances, list) and instances:
-            for inst in instances:
-                if not isinstance(inst, dict):
-                    continue
-                st = timecode_to_seconds(inst.get("start"))
-                en = timecode_to_seconds(inst.get("end"))
-                out.append(TimedText("ocr", text, st, en, conf_f))
-        else:
-            out.append(TimedText("ocr", text, None, None, conf_f))
-
-    return out
+    return list(_iter_items(ocr, "ocr", min_conf))
 
 
 def extract_vi_transcript_items(insights: Dict[str, Any], min_conf: float = 0.0) -> List[TimedText]:
     vi = _get_primary_video_insights(insights)
-    tx = vi.get("transcript") or []
-    out: List[TimedText] = []
-    if not isinstance(tx, list):
-        return out
-
-    for item in tx:
-        if not isinstance(item, dict):
-            continue
-        text = (item.get("text") or "").strip()
-        if not text:
-            continue
-        conf = item.get("confidence")
-        try:
-            conf_f = float(conf) if conf is not None else None
-        except Exception:
-            conf_f = None
-
-        if conf_f is not None and conf_f < min_conf:
-            continue
-
-        instances = item.get("instances") or []
-        if isinstance(instances, list) and instances:
-            for inst in instances:
-                if not isinstance(inst, dict):
-                    continue
-                st = timecode_to_seconds(inst.get("start"))
-                en = timecode_to_seconds(inst.get("end"))
-                out.append(TimedText("vi_transcript", text, st, en, conf_f))
-        else:
-            out.append(TimedText("vi_transcript", text, None, None, conf_f))
-    return out
+    return list(_iter_items(vi.get("transcript") or [], "vi_transcript", min_conf))
 
 
 def join_text(items: List[TimedText], max_chars: int = 12000) -> str:
     """
     Joins texts with newline, truncates.
     """
-    buf = []
-    total = 0
-    for it in items:
-        line = it.text.strip()
-        if not line:
-            continue
-        if total + len(line) + 1 > max_chars:
-            break
-        buf.append(line)
-        total += len(line) + 1
-    return "\n".join(buf)
+    lines = [line for it in items if (line := it.text.strip())]
+    # cumulative length incl. the newline per line; keep the longest prefix that fits
+    cutoff = bisect_right(list(accumulate(len(line) + 1 for line in lines)), max_chars)
+    return "\n".join(lines[:cutoff])
@@ -1,16 +1,37 @@
 import os
 import re
-import json
+import atexit
 import time
 import argparse
+import threading
+import orjson
 import requests
-from typing import Any, Dict, List, Optional, Union
+from bisect import insort
+from functools import lru_cache
+from collections import defaultdict
+from math import inf, isfinite
+from operator import itemgetter
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Union
 from dotenv import load_dotenv
 
+# Shared, memoized VI timecode parser ("0:00:03.0333333" / "0:03.03")
+from vi_insights_reader import read_insights_json, timecode_to_seconds as parse_time_to_seconds
+
 NOTION_API_BASE = "https://api.notion.com/v1"
 DEFAULT_NOTION_VERSION = "2025-09-03"
 DEFAULT_STATE_FILE = ".notion_state.json"
 
+# Precompiled once; the per-item/per-line loops below call these many times per video
+_NONWORD_RE = re.compile(r"[\W_]+")
+_TS_PREFIX_RE = re.compile(r"^\[\d+(?:\.\d+)?s\]\s*")
+_NUM_RE = re.compile(r"\b\d{2,}\b")
+
+# Takeaway keywords, matched against upper-cased OCR text
+_FILLING_KEYWORDS = ("NHAN", "TRUNG", "PHO MAI", "PHÔ MAI")
+_CLAIM_KEYWORDS = ("NONG", "NÓNG", "GION", "GIÒN", "THOM", "THƠM", "NGON", "DAM BAO", "ĐẢM BẢO")
+
 
 # -----------------------------
 # General helpers
@@ -30,28 +51,38 @@ def notion_headers(token: str, notion_version: str) -> Dict[str, str]:
     }
 
 
-def safe_get(obj: Any, path: List[Any], default=None):
+def make_getter(path: List[Any], default=None):
     """
-    Safe getter that supports dict keys + list indices.
-    Your old version only worked for dicts, so videos[0] always failed.
+    Safe getter for a fixed path of dict keys + list indices (default when any step is missing).
+    The loop over a pre-built tuple runs under one try/except instead of per-step type checks.
     """
-    cur = obj
-    for p in path:
+    def _get(obj: Any, _p: tuple = tuple(path), _d: Any = default):
         try:
-            if isinstance(cur, dict):
-                cur = cur[p]
-            elif isinstance(cur, list) and isinstance(p, int):
-                cur = cur[p]
-            else:
-                return default
+            for k in _p:
+                obj = obj[k]
+            return obj
         except (KeyError, IndexError, TypeError):
-            return default
-    return cur
+            return _d
+
+    return _get
 
 
-def chunk_text(s: str, chunk_size: int = 1800) -> List[str]:
+# Static paths read for every video
+_GET_V0_INSIGHTS = make_getter(["videos", 0, "insights"])
+_GET_V0_NAME = make_getter(["videos", 0, "name"])
+_GET_V0_VIDEO_NAME = make_getter(["videos", 0, "videoName"])
+_GET_V0_ID = make_getter(["videos", 0, "id"])
+_GET_DURATION_TIME = make_getter(["duration", "time"])  # on summarizedInsights
+
+
+def chunk_text(s: str, chunk_size: int = 1800) -> Iterator[str]:
+    # Lazy: callers build one block per chunk, so no intermediate list of slices
     s = s or ""
-    return [s[i : i + chunk_size] for i in range(0, len(s), chunk_size)] or [""]
+    if not s:
+        yield ""
+        return
+    for i in range(0, len(s), chunk_size):
+        yield s[i : i + chunk_size]
 
 
 def rt(text: str) -> List[Dict[str, Any]]:
@@ -59,35 +90,48 @@ def rt(text: str) -> List[Dict[str, Any]]:
     return [{"type": "text", "text": {"content": text}}]
 
 
-def parse_time_to_seconds(t: str) -> Optional[float]:
-    # Handles "0:00:03.0333333"
-    if not t:
-        return None
-    parts = t.split(":")
-    try:
-        if len(parts) == 3:
-            h = int(parts[0])
-            m = int(parts[1])
-            s = float(parts[2])
-            return h * 3600 + m * 60 + s
-        if len(parts) == 2:
-            m = int(parts[0])
-            s = float(parts[1])
-            return m * 60 + s
-    except ValueError:
-        return None
-    return None
-
-
 # -----------------------------
 # Notion API wrapper w/ retry
 # -----------------------------
+class TokenBucket:
+    """
+    Client-side rate limit: `rate` requests/s on average, bursts up to `capacity`. Thread-safe.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# Keep-alive session (no TLS handshake per call) + stay just under Notion's ~3 req/s limit
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=8, max_retries=0))
+atexit.register(_SESSION.close)
+_RATE_LIMIT = TokenBucket(rate=2.8, capacity=3)
+
+
 def notion_request(method: str, url: str, headers: Dict[str, str], payload: Optional[dict] = None) -> dict:
     max_attempts = 6
     backoff = 0.8
 
     for attempt in range(1, max_attempts + 1):
-        r = requests.request(method, url, headers=headers, json=payload, timeout=30)
+        _RATE_LIMIT.acquire()
+        r = _SESSION.request(method, url, headers=headers, json=payload, timeout=30)
 
         if r.ok:
             return r.json() if r.text else {}
@@ -114,21 +158,46 @@ def notion_request(method: str, url: str, headers: Dict[str, str], payload: Opti
 # -----------------------------
 # Notion blocks
 # -----------------------------
-def heading(level: int, text: str) -> Dict[str, Any]:
-    t = f"heading_{level}"
-    return {"object": "block", "type": t, t: {"rich_text": rt(text)}}
+class _Block(NamedTuple):
+    # Compact block (Notion type + text); expanded to Notion JSON only when a batch is sent
+    type: str
+    text: str = ""
+
+
+def heading(level: int, text: str) -> _Block:
+    return _Block(f"heading_{level}", text)
+
+
+def paragraph(text: str) -> _Block:
+    return _Block("paragraph", text)
+
 
+def bullet(text: str) -> _Block:
+    return _Block("bulleted_list_item", text)
 
-def paragraph(text: str) -> Dict[str, Any]:
-    return {"object": "block", "type": "paragraph", "paragraph": {"rich_text": rt(text)}}
 
+_DIVIDER = _Block("divider")
 
-def bullet(text: str) -> Dict[str, Any]:
-    return {"object": "block", "type": "bulleted_list_item", "bulleted_list_item": {"rich_text": rt(text)}}
 
+def divider() -> _Block:
+    return _DIVIDER
 
-def divider() -> Dict[str, Any]:
-    return {"object": "block", "type": "divider", "divider": {}}
+
+def _to_notion(block: _Block) -> Dict[str, Any]:
+    t = block.type
+    if t == "divider":
+        return {"object": "block", "type": t, t: {}}
+    return {"object": "block", "type": t, t: {"rich_text": rt(block.text)}}
+
+
+def _extend_bullets(blocks: List[_Block], items: List[str], limit: Optional[int], empty_msg: str) -> None:
+    # Appends in place (no temp list per section); placeholder paragraph when nothing was added
+    added = False
+    for x in items[:limit]:
+        blocks.append(bullet(x))
+        added = True
+    if not added:
+        blocks.append(paragraph(empty_msg))
 
 
 # -----------------------------
@@ -136,7 +205,7 @@ def divider() -> Dict[str, Any]:
 # -----------------------------
 def get_insights_dict(vi: dict) -> dict:
     # Most common shape: vi["videos"][0]["insights"]
-    d = safe_get(vi, ["videos", 0, "insights"], None)
+    d = _GET_V0_INSIGHTS(vi)
     if isinstance(d, dict):
         return d
     # Fallback: if someone passed inner object
@@ -144,38 +213,50 @@ def get_insights_dict(vi: dict) -> dict:
     return d if isinstance(d, dict) else {}
 
 
-def pick_video_name(vi: dict, fallback: str) -> str:
+class _VIView(NamedTuple):
+    # Per-video lookups resolved once and shared by the pick_*/extract_* helpers
+    raw: dict
+    insights: dict
+    summ: dict
+
+
+def _view(vi: dict) -> _VIView:
+    summ = vi.get("summarizedInsights")
+    return _VIView(vi, get_insights_dict(vi), summ if isinstance(summ, dict) else {})
+
+
+def pick_video_name(v: _VIView, fallback: str) -> str:
     return (
-        vi.get("name")
-        or safe_get(vi, ["videos", 0, "name"])
-        or safe_get(vi, ["videos", 0, "videoName"])
-        or safe_get(vi, ["summarizedInsights", "name"])
+        v.raw.get("name")
+        or _GET_V0_NAME(v.raw)
+        or _GET_V0_VIDEO_NAME(v.raw)
+        or v.summ.get("name")
         or fallback
     )
 
 
-def pick_video_id(vi: dict) -> Optional[str]:
-    return vi.get("id") or safe_get(vi, ["summarizedInsights", "id"]) or safe_get(vi, ["videos", 0, "id"])
+def pick_video_id(v: _VIView) -> Optional[str]:
+    return v.raw.get("id") or v.summ.get("id") or _GET_V0_ID(v.raw)
 
 
-def pick_duration(vi: dict) -> Optional[str]:
-    ins = get_insights_dict(vi)
+def pick_duration(v: _VIView) -> Optional[str]:
+    ins = v.insights
     return (
-        vi.get("duration")
+        v.raw.get("duration")
         or ins.get("duration")
-        or safe_get(vi, ["summarizedInsights", "duration", "time"])
-        or safe_get(vi, ["summarizedInsights", "duration"])
+        or _GET_DURATION_TIME(v.summ)
+        or v.summ.get("duration")
     )
 
 
-def pick_created(vi: dict) -> Optional[str]:
-    return vi.get("created") or safe_get(vi, ["summarizedInsights", "created"])
+def pick_created(v: _VIView) -> Optional[str]:
+    return v.raw.get("created") or v.summ.get("created")
 
 
-def extract_keywords(vi: dict, limit: int = 30) -> List[str]:
-    ins = get_insights_dict(vi)
+def extract_keywords(v: _VIView, limit: int = 30) -> List[str]:
+    ins = v.insights
     # Could be summarizedInsights.keywords or insights.keywords
-    items = safe_get(vi, ["summarizedInsights", "keywords"], None)
+    items = v.summ.get("keywords")
     if not isinstance(items, list):
         items = ins.get("keywords") or []
 
@@ -188,9 +269,9 @@ def extract_keywords(vi: dict, limit: int = 30) -> List[str]:
     return [x for x in out if x]
 
 
-def extract_labels(vi: dict, limit: int = 30) -> List[str]:
-    ins = get_insights_dict(vi)
-    items = safe_get(vi, ["summarizedInsights", "labels"], None)
+def extract_labels(v: _VIView, limit: int = 30) -> List[str]:
+    ins = v.insights
+    items = v.summ.get("labels")
     if not isinstance(items, list):
         items = ins.get("labels") or []
 
@@ -202,9 +283,9 @@ def extract_labels(vi: dict, limit: int = 30) -> List[str]:
     return [x for x in out if x]
 
 
-def extract_topics(vi: dict, limit: int = 15) -> List[str]:
-    ins = get_insights_dict(vi)
-    items = safe_get(vi, ["summarizedInsights", "topics"], None)
+def extract_topics(v: _VIView, limit: int = 15) -> List[str]:
+    ins = v.insights
+    items = v.summ.get("topics")
     if not isinstance(items, list):
         items = ins.get("topics") or []
 
@@ -221,9 +302,9 @@ def extract_topics(vi: dict, limit: int = 15) -> List[str]:
     return out
 
 
-def extract_sentiments(vi: dict, limit: int = 10) -> List[str]:
-    ins = get_insights_dict(vi)
-    items = safe_get(vi, ["summarizedInsights", "sentiments"], None)
+def extract_sentiments(v: _VIView, limit: int = 10) -> List[str]:
+    ins = v.insights
+    items = v.summ.get("sentiments")
     if not isinstance(items, list):
         items = ins.get("sentiments") or []
 
@@ -245,8 +326,8 @@ def extract_sentiments(vi: dict, limit: int = 10) -> List[str]:
     return out
 
 
-def extract_transcript_text(vi: dict) -> str:
-    ins = get_insights_dict(vi)
+def extract_transcript_text(v: _VIView) -> str:
+    ins = v.insights
     items = ins.get("transcript") or []
     texts = []
     for t in items:
@@ -256,7 +337,7 @@ def extract_transcript_text(vi: dict) -> str:
         # filter junk like "I."
         if len(txt) < 4:
             continue
-        if re.fullmatch(r"[\W_]+", txt):
+        if _NONWORD_RE.fullmatch(txt):
             continue
         if isinstance(conf, (int, float)) and conf < 0.30:
             continue
@@ -266,69 +347,58 @@ def extract_transcript_text(vi: dict) -> str:
     return " ".join(texts).strip()
 
 
-def extract_ocr_lines(vi: dict, max_lines: int = 60) -> List[str]:
-    ins = get_insights_dict(vi)
+def extract_ocr_lines(v: _VIView, max_lines: int = 60) -> List[str]:
+    ins = v.insights
     ocr_items = ins.get("ocr") or []
-    best_start: Dict[str, float] = {}
+    # earliest start per distinct text; inf = no timestamp
+    best_start: Dict[str, float] = defaultdict(lambda: inf)
 
     for o in ocr_items:
         txt = (o.get("text") or "").strip()
         if not txt:
             continue
 
-        instances = o.get("instances") or []
+        instances = o.get("instances")
         start = None
         if instances:
-            s = instances[0].get("start") or instances[0].get("adjustedStart")
-            start = parse_time_to_seconds(s) if s else None
+            inst = instances[0]
+            s = inst.get("start") or inst.get("adjustedStart")
+            if s:
+                start = parse_time_to_seconds(s)
+        if start is None:
+            start = inf
 
-        key = txt
-        cur = best_start.get(key)
-        val = start if start is not None else 999999.0
-        if cur is None or val < cur:
-            best_start[key] = val
+        if start < best_start[txt]:
+            best_start[txt] = start
 
     # sort by timestamp, then keep only max_lines
-    ordered = sorted(best_start.items(), key=lambda x: x[1])[:max_lines]
-    out = []
-    for txt, ts in ordered:
-        if ts != 999999.0:
-            out.append(f"[{ts:.1f}s] {txt}")
-        else:
-            out.append(txt)
-    return out
+    ordered = sorted(best_start.items(), key=itemgetter(1))[:max_lines]
+    return [f"[{ts:.1f}s] {txt}" if isfinite(ts) else txt for txt, ts in ordered]
 
 
 def extract_takeaways_from_ocr(ocr_lines: List[str]) -> Dict[str, Any]:
     # ocr_lines are like "[12.3s] TEXT" — strip timestamps
     texts = []
     for line in ocr_lines:
-        cleaned = re.sub(r"^\[\d+(\.\d+)?s\]\s*", "", line).strip()
+        cleaned = _TS_PREFIX_RE.sub("", line).strip()
         if cleaned:
             texts.append(cleaned)
 
     handle = next((t for t in texts if "@" in t), None)
 
     # Very rough "address-ish" detector: has a number and a comma
-    address = next((t for t in texts if re.search(r"\b\d{2,}\b", t) and "," in t), None)
+    address = next((t for t in texts if "," in t and _NUM_RE.search(t)), None)
 
     dish = None
-    for t in texts:
-        up = t.upper()
-        if "BANH" in up and ("TIEU" in up or "TIÊU" in up):
-            dish = t
-            break
-
     fillings = []
-    for t in texts:
-        up = t.upper()
-        if any(k in up for k in ["NHAN", "TRUNG", "PHO MAI", "PHÔ MAI"]):
-            fillings.append(t)
-
     claims = []
     for t in texts:
-        up = t.upper()
-        if any(k in up for k in ["NONG", "NÓNG", "GION", "GIÒN", "THOM", "THƠM", "NGON", "NGON", "DAM BAO", "ĐẢM BẢO"]):
+        up = t.upper()  # once per line, shared by all checks
+        if dish is None and "BANH" in up and ("TIEU" in up or "TIÊU" in up):
+            dish = t
+        if any(k in up for k in _FILLING_KEYWORDS):
+            fillings.append(t)
+        if any(k in up for k in _CLAIM_KEYWORDS):
             claims.append(t)
 
     def dedupe(lst):
@@ -353,18 +423,33 @@ def extract_takeaways_from_ocr(ocr_lines: List[str]) -> Dict[str, Any]:
 # -----------------------------
 # Notion page strategy: one log page
 # -----------------------------
-def get_data_source_id(database_id: str, headers: Dict[str, str]) -> Optional[str]:
-    # Some Notion versions return data_sources[]
+@lru_cache(maxsize=32)
+def _ds_id_cached(database_id: str, headers_tuple: tuple) -> Optional[str]:
+    # Raises on request failure so errors are never cached (lru_cache only stores returns)
     url = f"{NOTION_API_BASE}/databases/{database_id}"
+    data = notion_request("GET", url, headers=dict(headers_tuple))
+    ds = data.get("data_sources") or []
+    return ds[0].get("id") if ds else None
+
+
+def get_data_source_id(database_id: str, headers: Dict[str, str]) -> Optional[str]:
+    # Some Notion versions return data_sources[]; invariant per database, so cached per process
     try:
-        data = notion_request("GET", url, headers=headers)
+        return _ds_id_cached(database_id, tuple(sorted(headers.items())))
     except Exception:
         return None
-    ds = data.get("data_sources") or []
-    return ds[0].get("id") if ds else None
+
+
+# (database_id, title_prop, title) -> page_id; hits only, so a page created later is still found
+_PAGE_ID_CACHE: Dict[tuple, str] = {}
 
 
 def find_page_in_database(database_id: str, title_prop: str, title: str, headers: Dict[str, str]) -> Optional[str]:
+    key = (database_id, title_prop, title)
+    cached = _PAGE_ID_CACHE.get(key)
+    if cached:
+        return cached
+
     url = f"{NOTION_API_BASE}/databases/{database_id}/query"
     payload = {
         "filter": {
@@ -376,7 +461,10 @@ def find_page_in_database(database_id: str, title_prop: str, title: str, headers
     results = data.get("results") or []
     if not results:
         return None
-    return results[0].get("id")
+    page_id = results[0].get("id")
+    if page_id:
+        _PAGE_ID_CACHE[key] = page_id
+    return page_id
 
 
 def create_log_page(database_id: str, data_source_id: Optional[str], title_prop: str, title: str, headers: Dict[str, str]) -> Dict[str, Any]:
@@ -394,52 +482,67 @@ def create_log_page(database_id: str, data_source_id: Optional[str], title_prop:
     return notion_request("POST", url, headers=headers, payload=payload)
 
 
-def append_blocks(block_id: str, blocks: List[Dict[str, Any]], headers: Dict[str, str]) -> None:
+def append_blocks(block_id: str, blocks: List[_Block], headers: Dict[str, str]) -> None:
     url = f"{NOTION_API_BASE}/blocks/{block_id}/children"
     batch_size = 90
+    # Sequential on purpose: Notion appends children in arrival order, so concurrent PATCHes
+    # to the same block could interleave sections. The pooled session keeps each call cheap.
     for i in range(0, len(blocks), batch_size):
         batch = blocks[i : i + batch_size]
-        notion_request("PATCH", url, headers=headers, payload={"children": batch})
+        notion_request("PATCH", url, headers=headers, payload={"children": [_to_notion(b) for b in batch]})
 
 
 # -----------------------------
 # State (avoid duplicates)
 # -----------------------------
 def load_state(path: str) -> dict:
-    if not os.path.exists(path):
-        return {"ingested_video_ids": []}
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {"ingested_video_ids": []}
+    """
+    {"ingested_video_ids": [...], "page_id": ..., "title_to_page_id": {title: page_id},
+     "data_source_ids": {database_id: data_source_id}}
+    The two maps cache Notion lookups so repeat runs skip those round-trips.
+    ingested_video_ids is kept sorted + unique (cheap for files already saved that way).
+    """
+    state = {"ingested_video_ids": []}
+    if os.path.exists(path):
+        try:
+            state = orjson.loads(Path(path).read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            pass
+    state["ingested_video_ids"] = sorted(set(state.get("ingested_video_ids") or []))
+    state.setdefault("title_to_page_id", {})
+    state.setdefault("data_source_ids", {})
+    return state
 
 
 def save_state(path: str, state: dict) -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(state, f, indent=2)
+    # Write-then-rename so a crash mid-write never leaves a truncated state file
+    tmp = path + ".tmp"
+    Path(tmp).write_bytes(orjson.dumps(state, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+    os.replace(tmp, path)
 
 
 # -----------------------------
 # Build blocks for ONE video entry (append section)
 # -----------------------------
-def build_video_section_blocks(vi: dict, source_file: str) -> List[Dict[str, Any]]:
-    name = pick_video_name(vi, fallback=os.path.basename(source_file))
-    video_id = pick_video_id(vi) or "unknown"
-    duration = pick_duration(vi)
-    created = pick_created(vi)
-
-    keywords = extract_keywords(vi)
-    labels = extract_labels(vi)
-    topics = extract_topics(vi)
-    sentiments = extract_sentiments(vi)
-    transcript = extract_transcript_text(vi)
-    ocr_lines = extract_ocr_lines(vi)
+def build_video_section_blocks(vi: dict, source_file: str) -> List[_Block]:
+    v = _view(vi)
+    base = os.path.basename(source_file)
+    name = pick_video_name(v, fallback=base)
+    video_id = pick_video_id(v) or "unknown"
+    duration = pick_duration(v)
+    created = pick_created(v)
+
+    keywords = extract_keywords(v)
+    labels = extract_labels(v)
+    topics = extract_topics(v)
+    sentiments = extract_sentiments(v)
+    transcript = extract_transcript_text(v)
+    ocr_lines = extract_ocr_lines(v)
     take = extract_takeaways_from_ocr(ocr_lines)
 
-    blocks: List[Dict[str, Any]] = []
+    blocks: List[_Block] = []
     blocks.append(heading(2, f"🎬 {name}  —  {video_id}"))
-    blocks.append(bullet(f"Source file: {os.path.basename(source_file)}"))
+    blocks.append(bullet(f"Source file: {base}"))
     if duration:
         blocks.append(bullet(f"Duration: {duration}"))
     if created:
@@ -463,32 +566,27 @@ def build_video_section_blocks(vi: dict, source_file: str) -> List[Dict[str, Any
 
     # Keywords/labels/topics/sentiment
     blocks.append(heading(3, "Keywords"))
-    blocks += [bullet(k) for k in keywords[:25]] or [paragraph("(none)")]
+    _extend_bullets(blocks, keywords, 25, "(none)")
 
     blocks.append(heading(3, "Labels"))
-    blocks += [bullet(l) for l in labels[:25]] or [paragraph("(none)")]
+    _extend_bullets(blocks, labels, 25, "(none)")
 
     blocks.append(heading(3, "Topics"))
-    blocks += [bullet(t) for t in topics[:15]] or [paragraph("(none)")]
+    _extend_bullets(blocks, topics, 15, "(none)")
 
     blocks.append(heading(3, "Sentiment"))
-    blocks += [bullet(s) for s in sentiments[:10]] or [paragraph("(none)")]
+    _extend_bullets(blocks, sentiments, 10, "(none)")
 
     # Transcript
     blocks.append(heading(3, "Transcript"))
     if transcript:
-        for chunk in chunk_text(transcript):
-            blocks.append(paragraph(chunk))
+        blocks.extend(paragraph(c) for c in chunk_text(transcript))
     else:
         blocks.append(paragraph("(Transcript is empty or too low-quality; OCR is likely more useful for TikToks.)"))
 
     # OCR
     blocks.append(heading(3, "On-screen text (OCR)"))
-    if ocr_lines:
-        for line in ocr_lines:
-            blocks.append(bullet(line))
-    else:
-        blocks.append(paragraph("(none)"))
+    _extend_bullets(blocks, ocr_lines, None, "(none)")
 
     blocks.append(divider())
     return blocks
@@ -515,14 +613,14 @@ def main():
 
     headers = notion_headers(notion_token, notion_version)
 
-    with open(args.file, "r", encoding="utf-8") as f:
-        vi = json.load(f)
+    vi = read_insights_json(args.file)
 
-    video_id = pick_video_id(vi) or os.path.basename(args.file)
+    video_id = pick_video_id(_view(vi)) or os.path.basename(args.file)
 
     # Load state for dedupe
     state = load_state(args.state_file)
-    ingested = set(state.get("ingested_video_ids") or [])
+    ingested_ids = state["ingested_video_ids"]  # sorted list (persisted); set for O(1) lookups
+    ingested = set(ingested_ids)
 
     if (not args.force) and (video_id in ingested):
         print(f"↩️  Skipping (already ingested): {video_id}")
@@ -531,8 +629,11 @@ def main():
     # Decide target page (append to one log page)
     page_id = args.page_id
 
-    # ✅ add this
+    # Cached from earlier runs: log page by title (older state files only have page_id)
+    title_to_page_id = state["title_to_page_id"]
     if not page_id:
+        page_id = title_to_page_id.get(args.log_title)
+    if not page_id and not title_to_page_id:
         page_id = state.get("page_id")
 
     if not page_id:
@@ -540,17 +641,21 @@ def main():
         if existing:
             page_id = existing
         else:
-            ds_id = get_data_source_id(notion_db_id, headers)
+            ds_ids = state["data_source_ids"]
+            ds_id = ds_ids.get(notion_db_id) or get_data_source_id(notion_db_id, headers)
+            if ds_id:
+                ds_ids[notion_db_id] = ds_id
             page = create_log_page(notion_db_id, ds_id, title_prop, args.log_title, headers)
             page_id = page["id"]
+        title_to_page_id[args.log_title] = page_id
 
     # Build and append
     blocks = build_video_section_blocks(vi, source_file=args.file)
     append_blocks(page_id, blocks, headers=headers)
 
     # Save state
-    ingested.add(video_id)
-    state["ingested_video_ids"] = sorted(ingested)
+    if video_id not in ingested:
+        insort(ingested_ids, video_id)
     state["page_id"] = page_id
     save_state(args.state_file, state)
 
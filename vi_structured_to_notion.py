@@ -26,6 +26,8 @@ from notion_dbs import (
     upsert_dish,
     upsert_place,
     create_or_get_mention,
+    index_pages,
+    map_concurrent,
     compute_mention_score,
     iso_from_created_plus_offset,
     require_env,
@@ -72,6 +74,8 @@ def main():
             cache_path=cache_path,
             model_size=model_size,
             language=language,
+            beam_size=int(os.getenv("WHISPER_BEAM_SIZE", "1")),
+            backend=os.getenv("WHISPER_BACKEND", "faster_whisper"),
         )
 
     # 3) Build evidence pack (this is the “OCR → LLM” bridge)
@@ -112,39 +116,77 @@ def main():
         props,
         video_id=video_id,
         title=f"{meta.get('filename') or video_id}",
-        source_file=str(insights_path.name),
+        source_file=insights_path.name,
         created_iso=meta.get("created"),
         duration=meta.get("duration"),
         ocr_raw=evidence["ocr_compact"],
         stt_raw=evidence["stt_compact"],
     )
 
-    # 5b) For each mention: upsert dish, upsert place, create mention
     mentions = extraction.get("mentions", [])
-    created_mentions = 0
-    for i, m in enumerate(mentions, start=1):
+    notion_workers = int(os.getenv("NOTION_MAX_WORKERS", "3"))
+
+    # Opt-in (batch runs): prefetch dishes/places with one paged scan so lookups are local.
+    # A scan costs ceil(rows/100) calls and both DBs grow per video, so for a normal run
+    # with a handful of mentions the per-entity equals queries are cheaper.
+    dish_index: Optional[Dict[str, Dict[str, Any]]] = None
+    place_index: Optional[Dict[str, Dict[str, Any]]] = None
+    if mentions and os.getenv("NOTION_PREFETCH_INDEX", "0") == "1":
+        dish_index, place_index = map_concurrent(
+            lambda spec: index_pages(notion.scan_database(spec[0]), spec[1]),
+            [(db_ids.dishes, props.dish_title), (db_ids.places, props.place_title)],
+            max_workers=notion_workers,
+        )
+
+    # 5b) Upsert each distinct dish once, concurrently (aliases merged across mentions)
+    dishes: Dict[str, Dict[str, Any]] = {}
+    for m in mentions:
+        dish = m["dish"]
+        d = dishes.setdefault(dish["canonical"], {"aliases": [], "category": None})
+        d["aliases"] += dish.get("aliases", [])
+        d["category"] = dish.get("category") or d["category"]
+
+    dish_page_ids = map_concurrent(
+        lambda item: upsert_dish(
+            notion,
+            db_ids,
+            props,
+            canonical=item[0],
+            aliases=item[1]["aliases"],
+            category=item[1]["category"],
+            index=dish_index,
+        ),
+        dishes.items(),
+        max_workers=notion_workers,
+    )
+    dish_ids = dict(zip(dishes, dish_page_ids))
+
+    # 5c) For each mention: upsert place, create mention.
+    # Mentions sharing a place name run in order on one worker (no duplicate place/mention
+    # creates); different places fan out concurrently.
+    def place_name(place: Optional[Dict[str, Any]]) -> Optional[str]:
+        # Title the place row is upserted under; also the grouping key, so the two always agree
+        if place and (place.get("name") or place.get("address")):
+            return (place.get("name") or "Unknown place").strip()
+        return None
+
+    def handle_mention(m: Dict[str, Any]) -> None:
         dish = m["dish"]
         place = m.get("place")  # may be null
         confidence = float(m["confidence"])
         start_sec = m.get("start_sec")
         end_sec = m.get("end_sec")
 
-        dish_id = upsert_dish(
-            notion,
-            db_ids,
-            props,
-            canonical=dish["canonical"],
-            aliases=dish.get("aliases", []),
-            category=dish.get("category"),
-        )
+        dish_id = dish_ids[dish["canonical"]]
 
         place_id = None
-        if place and (place.get("name") or place.get("address")):
+        name = place_name(place)
+        if name is not None:
             place_id = upsert_place(
                 notion,
                 db_ids,
                 props,
-                name=(place.get("name") or "Unknown place").strip(),
+                name=name,
                 dish_ids=[dish_id],
                 address=place.get("address"),
                 district=place.get("district"),
@@ -152,6 +194,7 @@ def main():
                 price_range=place.get("price_range"),
                 description=place.get("description"),
                 tiktok_handle=place.get("tiktok_handle"),
+                index=place_index,
             )
 
         has_place = place_id is not None
@@ -180,7 +223,13 @@ def main():
             mention_score=mention_score,
             mention_time_iso=mention_time_iso,
         )
-        created_mentions += 1
+
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for m in mentions:
+        groups.setdefault(place_name(m.get("place")) or "", []).append(m)
+
+    map_concurrent(lambda ms: [handle_mention(m) for m in ms], groups.values(), max_workers=notion_workers)
+    created_mentions = len(mentions)
 
     print(f"✅ Done. Video={video_id} VideoRow={video_page_id} MentionsUpserted={created_mentions}")
 
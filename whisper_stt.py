@@ -1,110 +1,420 @@
 # whisper_stt.py
+"""
+Whisper STT via faster-whisper (CTranslate2).
+
+To skip the Hub download/conversion on first run, convert once and point WHISPER_MODEL_DIR at it:
+  ct2-transformers-converter --model openai/whisper-small --quantization int8 --output_dir ./models/faster-small-int8
+
+Optional backend="openvino" (Intel CPUs; `pip install openvino-genai`) loads an OpenVINO export from model_dir:
+  optimum-cli export openvino --model openai/whisper-small --quant-mode int8 --dataset librispeech --num-samples 32 whisper_ov_int8
+"""
 from __future__ import annotations
 
-import json
+import hashlib
+import multiprocessing
 import os
+import queue
 import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any, Iterable, Iterator, Tuple, TypeVar
 
-from faster_whisper import WhisperModel
+import ctranslate2
+import numpy as np
+import orjson
+from faster_whisper import BatchedInferencePipeline, WhisperModel
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class WhisperSegment:
+    # slots: thousands per long video; no per-object __dict__
     start_sec: float
     end_sec: float
     text: str
     avg_logprob: Optional[float] = None
 
 
-def _run_ffmpeg_extract_wav(video_path: Path, wav_path: Path, ffmpeg_path: str = "ffmpeg") -> None:
-    wav_path.parent.mkdir(parents=True, exist_ok=True)
+T = TypeVar("T")
+
+
+# Loading weights + CTranslate2 init dominates per-video time; keep one model per config
+_MODEL_CACHE: Dict[tuple, Any] = {}
+_MODEL_LOCK = threading.Lock()
+
+
+def _resolve_device(device: str, compute_type: Optional[str]) -> Tuple[str, str]:
+    """
+    device="auto" -> "cuda" when CTranslate2 sees a GPU, else "cpu".
+    Default compute_type: int8 weights + fp16 activations on CUDA, plain int8 on CPU.
+    """
+    if device == "auto":
+        device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    if not compute_type:
+        compute_type = "int8_float16" if device == "cuda" else "int8"
+    return device, compute_type
+
+
+def _get_model(model_size_or_path: str, device: str, compute_type: str) -> WhisperModel:
+    # WHISPER_DEVICE_INDEX: GPU ordinal, set per worker by transcribe_videos
+    device_index = int(os.getenv("WHISPER_DEVICE_INDEX", "0"))
+    key = (model_size_or_path, device, device_index, compute_type)
+    with _MODEL_LOCK:
+        model = _MODEL_CACHE.get(key)
+        if model is None:
+            model = _MODEL_CACHE[key] = WhisperModel(
+                model_size_or_path,
+                device=device,
+                device_index=device_index,
+                compute_type=compute_type,
+                num_workers=int(os.getenv("WHISPER_NUM_WORKERS", "1")),
+                cpu_threads=int(os.getenv("WHISPER_CPU_THREADS", str(os.cpu_count() or 0))),
+            )
+        return model
+
+
+def _get_ov_pipeline(model_dir: Optional[str]) -> Any:
+    if not model_dir:
+        raise RuntimeError("backend='openvino' needs model_dir / WHISPER_MODEL_DIR pointing at an OpenVINO export")
+    import openvino_genai  # optional dependency, only for this backend
+
+    key = ("openvino", model_dir)
+    with _MODEL_LOCK:
+        pipe = _MODEL_CACHE.get(key)
+        if pipe is None:
+            pipe = _MODEL_CACHE[key] = openvino_genai.WhisperPipeline(model_dir, "CPU")
+        return pipe
+
+
+def _ov_transcribe(pipe: Any, audio: np.ndarray, language: str) -> Iterator[Tuple[float, float, str, Optional[float]]]:
+    result = pipe.generate(audio.tolist(), language=f"<|{language}|>", task="transcribe", return_timestamps=True)
+    return ((c.start_ts, c.end_ts, c.text, None) for c in (result.chunks or []))
+
+
+_DONE = object()
+
+
+def _prefetch(items: Iterable[T]) -> Iterator[T]:
+    """
+    Drives the lazy decoder generator on a background thread (CTranslate2 releases the GIL),
+    so decoding continues while the caller does the per-segment Python work.
+    Decoder errors are re-raised here; closing early stops the producer at the next item.
+    """
+    q: queue.Queue = queue.Queue()
+    stop = threading.Event()
+
+    def _produce() -> None:
+        try:
+            for x in items:
+                if stop.is_set():
+                    return
+                q.put((x, None))
+            q.put((_DONE, None))
+        except BaseException as e:
+            q.put((_DONE, e))
+
+    threading.Thread(target=_produce, daemon=True).start()
+    try:
+        while True:
+            x, err = q.get()
+            if x is _DONE:
+                if err is not None:
+                    raise err
+                return
+            yield x
+    finally:
+        stop.set()
+
+
+@lru_cache(maxsize=256)
+def _load_cache(path: str, mtime_ns: int, size: int) -> Tuple[WhisperSegment, ...]:
+    # mtime/size in the key: a rewritten cache file is re-parsed, an unchanged one never is
+    raw = orjson.loads(Path(path).read_bytes())
+    return tuple(WhisperSegment(**s) for s in raw["segments"])
+
+
+# Windows: don't allocate a console per ffmpeg call in batch jobs
+_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0) if os.name == "nt" else 0
+
+
+def _ffmpeg_decode_s16le(video_path: str, ffmpeg_path: str = "ffmpeg") -> bytes:
+    # Audio track as raw 16 kHz mono s16le, read straight from ffmpeg's stdout (no temp WAV)
     cmd = [
         ffmpeg_path,
-        "-y",
-        "-i", str(video_path),
+        "-hide_banner",
+        "-loglevel", "error",
+        "-nostats",
+        "-i", video_path,
         "-vn",
+        "-f", "s16le",
+        "-acodec", "pcm_s16le",
         "-ac", "1",
         "-ar", "16000",
-        "-f", "wav",
-        str(wav_path),
+        "pipe:1",
     ]
-    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    proc = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, creationflags=_NO_WINDOW)
     if proc.returncode != 0:
-        raise RuntimeError(f"ffmpeg failed:\n{proc.stderr}")
+        raise RuntimeError(f"ffmpeg failed:\n{proc.stderr.decode('utf-8', 'replace')}")
+    return proc.stdout
+
 
+def _has_audio_stream(video_path: str) -> bool:
+    # ffprobe lists audio streams only; empty output = silent clip. Unknown (no ffprobe) -> assume audio.
+    cmd = [
+        os.getenv("FFPROBE_PATH", "ffprobe"),
+        "-v", "error",
+        "-select_streams", "a",
+        "-show_entries", "stream=codec_type",
+        "-of", "csv=p=0",
+        video_path,
+    ]
+    try:
+        proc = subprocess.run(cmd, stdin=subprocess.DEVNULL, capture_output=True, creationflags=_NO_WINDOW)
+    except OSError:
+        return True
+    if proc.returncode != 0:
+        return True
+    return bool(proc.stdout.strip())
 
-def transcribe_video(
+
+def _audio_key(video_path: str) -> str:
+    # Content key: first MB + size (cheap, survives renames/touches; different edits differ)
+    size = os.stat(video_path).st_size
+    with open(video_path, "rb") as f:
+        head = f.read(1 << 20)
+    return hashlib.blake2b(head + str(size).encode(), digest_size=8).hexdigest()
+
+
+def _open_tmp(path: str) -> Tuple[Any, str]:
+    # Unique temp file next to path (same filesystem for os.replace); concurrent writers never share one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    return os.fdopen(fd, "wb"), tmp_path
+
+
+def _load_audio(video_path: str, ffmpeg_path: str, pcm_dir: str) -> np.ndarray:
+    """
+    16 kHz mono float32 in [-1, 1) — the array form WhisperModel.transcribe accepts directly.
+    Opt-in (WHISPER_PCM_CACHE=1): keeps the decoded PCM (~115 MB per audio hour, never evicted)
+    in pcm_dir so sweeps over models/languages with distinct transcript caches skip ffmpeg.
+    """
+    if os.getenv("WHISPER_PCM_CACHE", "0") != "1":
+        data = _ffmpeg_decode_s16le(video_path, ffmpeg_path)
+    else:
+        pcm_path = os.path.join(pcm_dir, f"audio_{_audio_key(video_path)}.s16le")
+        try:
+            with open(pcm_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = _ffmpeg_decode_s16le(video_path, ffmpeg_path)
+            f, tmp_path = _open_tmp(pcm_path)
+            with f:
+                f.write(data)
+            os.replace(tmp_path, pcm_path)
+    return np.frombuffer(data, np.int16).astype(np.float32) / 32768.0
+
+
+def iter_transcribe_video(
     video_path: str | Path,
     cache_path: str | Path,
     model_size: str = "small",
     language: str = "vi",
-    device: str = "cpu",
-    compute_type: str = "int8",
-) -> List[WhisperSegment]:
+    device: str = "auto",
+    compute_type: Optional[str] = None,
+    batch_size: int = 8,
+    beam_size: int = 1,
+    best_of: int = 5,
+    temperature: float | Tuple[float, ...] = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+    condition_on_previous_text: bool = False,
+    model_dir: Optional[str] = None,
+    vad_min_silence_ms: int = 500,
+    backend: Literal["faster_whisper", "openvino"] = "faster_whisper",
+) -> Iterator[WhisperSegment]:
     """
-    Uses faster-whisper. Caches result to cache_path (json).
+    Uses faster-whisper. Yields segments as they are decoded while streaming them into
+    cache_path (json); the cache only appears once the whole video has been consumed.
+    batch_size > 1 decodes VAD chunks in batches (BatchedInferencePipeline); 1 = sequential.
+    model_dir (or WHISPER_MODEL_DIR): local pre-converted CTranslate2 model, used instead of model_size.
+    beam_size is the main decode-cost knob (greedy by default); not conditioning on the
+    previous window avoids hallucination loops and the re-decodes they trigger.
+    Segment-level timestamps only (no word alignment pass); VAD splits on vad_min_silence_ms
+    of silence and no_speech_threshold drops music-only windows common in TikToks.
+    backend="openvino" runs an OpenVINO GenAI WhisperPipeline from model_dir on CPU instead
+    (decode options above apply to faster-whisper only).
     """
-    cache_path = Path(cache_path)
-    if cache_path.exists():
-        with cache_path.open("r", encoding="utf-8") as f:
-            raw = json.load(f)
-        return [WhisperSegment(**s) for s in raw["segments"]]
-
-    video_path = Path(video_path)
-    if not video_path.exists():
+    # Plain str paths from here on; Path only where its helpers are needed
+    cache_path = os.fspath(cache_path)
+    try:
+        st = os.stat(cache_path)
+    except FileNotFoundError:
+        pass
+    else:
+        yield from _load_cache(cache_path, st.st_mtime_ns, st.st_size)
+        return
+
+    video_path = os.fspath(video_path)
+    if not os.path.exists(video_path):
         raise FileNotFoundError(f"Video not found: {video_path}")
 
+    cache_dir = os.path.dirname(cache_path) or "."
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # No audio track: nothing to decode or transcribe; cache the empty result
+    if not _has_audio_stream(video_path):
+        f, tmp_path = _open_tmp(cache_path)
+        with f:
+            f.write(orjson.dumps({"segments": []}))
+        os.replace(tmp_path, cache_path)
+        return
+
     ffmpeg_path = os.getenv("FFMPEG_PATH", "ffmpeg")
-    wav_path = cache_path.with_suffix(".wav")
-    _run_ffmpeg_extract_wav(video_path, wav_path, ffmpeg_path=ffmpeg_path)
-
-    model = WhisperModel(model_size, device=device, compute_type=compute_type)
-    segments, info = model.transcribe(
-        str(wav_path),
-        language=language,
-        vad_filter=True,
-        beam_size=5,
-    )
-
-    out: List[WhisperSegment] = []
-    for seg in segments:
-        text = (seg.text or "").strip()
-        if not text:
-            continue
-        out.append(
-            WhisperSegment(
-                start_sec=float(seg.start),
-                end_sec=float(seg.end),
-                text=text,
-                avg_logprob=getattr(seg, "avg_logprob", None),
-            )
-        )
+    # Decode (ffmpeg subprocess, drained on a thread) overlaps with model load on this thread
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        decoding = ex.submit(_load_audio, video_path, ffmpeg_path, cache_dir)
+        model_dir = model_dir or os.getenv("WHISPER_MODEL_DIR")
+        if backend == "openvino":
+            model = _get_ov_pipeline(model_dir)
+        else:
+            model = _get_model(model_dir or model_size, *_resolve_device(device, compute_type))
+        audio = decoding.result()
 
-    cache_path.parent.mkdir(parents=True, exist_ok=True)
-    with cache_path.open("w", encoding="utf-8") as f:
-        json.dump({"segments": [s.__dict__ for s in out]}, f, ensure_ascii=False, indent=2)
+    if backend == "openvino":
+        raw = _ov_transcribe(model, audio, language)
+    else:
+        opts: Dict[str, Any] = dict(
+            language=language,
+            vad_filter=True,
+            vad_parameters=dict(min_silence_duration_ms=vad_min_silence_ms),
+            beam_size=beam_size,
+            best_of=best_of,
+            temperature=temperature,
+            condition_on_previous_text=condition_on_previous_text,
+            word_timestamps=False,
+            without_timestamps=False,
+            suppress_blank=True,
+            no_speech_threshold=0.6,
+        )
+        if batch_size > 1:
+            segments, info = BatchedInferencePipeline(model=model).transcribe(audio, batch_size=batch_size, **opts)
+        else:
+            segments, info = model.transcribe(audio, **opts)
+        raw = ((seg.start, seg.end, seg.text, getattr(seg, "avg_logprob", None)) for seg in segments)
 
-    # Optional: keep wav for debugging; delete if you want
+    f, tmp_path = _open_tmp(cache_path)
+    done = False
     try:
-        wav_path.unlink(missing_ok=True)
-    except Exception:
-        pass
+        with f:
+            f.write(b'{"segments": [')
+            sep = b"\n"
+            for start, end, text, avg_logprob in _prefetch(raw):
+                text = (text or "").strip()
+                if not text:
+                    continue
+                s = WhisperSegment(
+                    start_sec=float(start),
+                    end_sec=float(end),
+                    text=text,
+                    avg_logprob=avg_logprob,
+                )
+                f.write(sep)
+                f.write(orjson.dumps({"start_sec": s.start_sec, "end_sec": s.end_sec, "text": s.text, "avg_logprob": s.avg_logprob}))
+                sep = b",\n"
+                yield s
+            f.write(b"\n]}\n")
+        os.replace(tmp_path, cache_path)
+        done = True
+    finally:
+        # Consumer stopped early or decode failed: never leave a partial cache behind
+        if not done:
+            Path(tmp_path).unlink(missing_ok=True)
+
+
+def transcribe_video(video_path: str | Path, cache_path: str | Path, **kwargs: Any) -> List[WhisperSegment]:
+    """
+    Uses faster-whisper. Caches result to cache_path (json).
+    kwargs: see iter_transcribe_video.
+    """
+    return list(iter_transcribe_video(video_path, cache_path, **kwargs))
+
+
+def _init_worker(cpu_threads: int, gpu_ids: Optional[Any]) -> None:
+    # Split cores between worker processes unless the user pinned a thread count
+    os.environ.setdefault("WHISPER_CPU_THREADS", str(cpu_threads))
+    # One GPU per worker: each takes a distinct ordinal from the shared queue
+    if gpu_ids is not None:
+        os.environ["WHISPER_DEVICE_INDEX"] = str(gpu_ids.get())
+
+
+def _transcribe_one(job: Tuple[str, str, Dict[str, Any]]) -> Tuple[str, List[WhisperSegment]]:
+    video_path, cache_path, kwargs = job
+    return video_path, transcribe_video(video_path, cache_path, **kwargs)
+
+
+def _batch_cache_name(video_path: str) -> str:
+    # stem for readability + hash of the absolute path: a/clip.mp4 and b/clip.mp4 never share a cache
+    digest = hashlib.blake2b(os.path.abspath(video_path).encode(), digest_size=6).hexdigest()
+    return f"whisper_{Path(video_path).stem}_{digest}.json"
+
+
+def transcribe_videos(
+    paths: List[str | Path],
+    cache_dir: str | Path,
+    num_workers: Optional[int] = None,
+    **kwargs: Any,
+) -> Dict[str, List[WhisperSegment]]:
+    """
+    Transcribes many videos in a process pool (one cached model per worker).
+    Caches to cache_dir/whisper_<stem>_<path hash>.json; returns {path as passed: segments}.
+    On CUDA: one worker per GPU, each pinned to its own device. On CPU the default is a
+    few workers sharing the cores (every worker holds a full model); raise num_workers if RAM allows.
+    Workers are spawned, not forked, so callers need an `if __name__ == "__main__":` guard.
+    kwargs are passed through to transcribe_video.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # dict: the same path passed twice is transcribed once
+    video_paths = list(dict.fromkeys(os.fspath(p) for p in paths))
+    jobs = [(p, str(cache_dir / _batch_cache_name(p)), kwargs) for p in video_paths]
+    if not jobs:
+        return {}
 
-    return out
+    cpus = os.cpu_count() or 1
+    workers = num_workers or min(4, max(1, cpus // 4))
+    # spawn: the CUDA probe below initialises CUDA here, and forked children can't use it
+    ctx = multiprocessing.get_context("spawn")
+    gpu_ids = None
+    if kwargs.get("backend", "faster_whisper") == "faster_whisper":
+        device, _ = _resolve_device(kwargs.get("device", "auto"), kwargs.get("compute_type"))
+        if device == "cuda":
+            gpus = max(1, ctranslate2.get_cuda_device_count())
+            workers = min(num_workers or gpus, gpus)
+            gpu_ids = ctx.Queue()
+            for i in range(gpus):
+                gpu_ids.put(i)
+    workers = max(1, min(workers, len(jobs)))
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(max(1, cpus // workers), gpu_ids),
+    ) as ex:
+        return dict(ex.map(_transcribe_one, jobs, chunksize=chunksize))
 
 
 def join_whisper_text(segments: List[WhisperSegment], max_chars: int = 12000) -> str:
+    # Segment text is stripped when produced (and cached that way), so no re-strip here
     buf = []
     total = 0
     for s in segments:
-        line = s.text.strip()
-        if not line:
+        n = len(s.text)
+        if not n:
             continue
-        if total + len(line) + 1 > max_chars:
+        nxt = total + n + 1
+        if nxt > max_chars:
             break
-        buf.append(line)
-        total += len(line) + 1
+        buf.append(s.text)
+        total = nxt
     return "\n".join(buf)